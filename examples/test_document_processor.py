@@ -6,12 +6,31 @@ This script sends example requests to the document processor API to verify
 it's working correctly.
 """
 
+import asyncio
 import json
 import sys
 import argparse
 import requests
-import base64
 from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+
+try:
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
+
+# Read buffer sizes for sample files; the 8 KB default needs many syscalls per MB
+READ_BUFFER_SIZE = 256 * 1024
+LARGE_READ_BUFFER_SIZE = 1024 * 1024
+
+# (connect, read) timeouts for API requests
+REQUEST_TIMEOUT = (3, 30)
+
+# Shared session so repeated requests reuse pooled keep-alive connections
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
 
 
 def parse_args() -> argparse.Namespace:
@@ -20,13 +39,37 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--api-url", required=True, help="API Gateway URL")
     parser.add_argument("--test-type", choices=["json", "image", "pdf"], default="json",
                         help="Type of test to run (default: json)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Send a single blocking request instead of running concurrently")
+    parser.add_argument("--requests", type=int, default=1,
+                        help="Number of requests to send in async mode (default: 1)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum requests in flight in async mode (default: 4)")
     return parser.parse_args()
 
 
-def test_json_processing(api_url: str) -> None:
-    """Test processing a JSON document."""
-    print("\n=== Testing JSON Document Processing ===\n")
+def b64_stream(path: str, chunk: int = 57 * 1024, buffering: int = READ_BUFFER_SIZE) -> bytes:
+    """
+    Base64-encode a file in fixed-size chunks.
+    
+    The chunk size must be a multiple of 3 so no padding is emitted mid-stream.
     
+    Args:
+        path: Path to the file to encode
+        chunk: Number of raw bytes to encode per read
+        buffering: Size of the file read buffer
+        
+    Returns:
+        Base64 encoded file contents
+    """
+    with open(path, "rb", buffering=buffering) as f:
+        return b"".join(
+            b64encode(block) for block in iter(lambda: f.read(chunk), b"")
+        )
+
+
+def build_json_payload() -> Dict[str, Any]:
+    """Build the request payload for the JSON document test."""
     # Example JSON data
     test_data = {
         "customer": {
@@ -47,112 +90,160 @@ def test_json_processing(api_url: str) -> None:
         "status": "processing"
     }
     
-    # Prepare the request payload
-    payload = {
+    return {
         "document_data": json.dumps(test_data),
         "document_type": "json",
         "instructions": "Extract the customer name, order total, and list of products purchased."
     }
+
+
+def build_image_payload() -> Optional[Dict[str, Any]]:
+    """Build the request payload for the image document test."""
+    # For testing, we'll use a simple image file
+    try:
+        image_data = b64_stream("examples/sample_receipt.jpg").decode("utf-8")
+    except FileNotFoundError:
+        print("Sample image file not found. Please create examples/sample_receipt.jpg")
+        return None
     
-    # Send the request
-    print("Sending request to API...")
-    print(f"Payload: {json.dumps(payload, indent=2)}")
+    return {
+        "document_data": image_data,
+        "document_type": "image",
+        "instructions": "Extract the store name, date, total amount, and list of items purchased from this receipt."
+    }
+
+
+def build_pdf_payload() -> Optional[Dict[str, Any]]:
+    """Build the request payload for the PDF document test."""
+    # For testing, we'll use a simple PDF file
+    try:
+        pdf_data = b64_stream("examples/sample_invoice.pdf", buffering=LARGE_READ_BUFFER_SIZE).decode("utf-8")
+    except FileNotFoundError:
+        print("Sample PDF file not found. Please create examples/sample_invoice.pdf")
+        return None
     
+    return {
+        "document_data": pdf_data,
+        "document_type": "pdf",
+        "instructions": "Extract the invoice number, date, customer details, and line items with their prices."
+    }
+
+
+PAYLOAD_BUILDERS = {
+    "json": build_json_payload,
+    "image": build_image_payload,
+    "pdf": build_pdf_payload,
+}
+
+
+def print_response(status_code: int, text: str) -> None:
+    """Print an API response."""
+    print(f"\nStatus Code: {status_code}")
+    if status_code == 200:
+        print("Response:")
+        print(json.dumps(json.loads(text), indent=2))
+    else:
+        print(f"Error: {text}")
+
+
+def send_request(api_url: str, payload: Dict[str, Any]) -> None:
+    """Send a single request using the shared session and print the response."""
     try:
-        response = requests.post(f"{api_url}/process", json=payload)
-        
-        # Print the response
-        print(f"\nStatus Code: {response.status_code}")
-        if response.status_code == 200:
-            result = response.json()
-            print("Response:")
-            print(json.dumps(result, indent=2))
-        else:
-            print(f"Error: {response.text}")
+        response = SESSION.post(f"{api_url}/process", json=payload, timeout=REQUEST_TIMEOUT)
+        print_response(response.status_code, response.text)
     except Exception as e:
         print(f"Request failed: {e}")
 
 
+def test_json_processing(api_url: str) -> None:
+    """Test processing a JSON document."""
+    print("\n=== Testing JSON Document Processing ===\n")
+    
+    payload = build_json_payload()
+    
+    # Send the request
+    print("Sending request to API...")
+    print(f"Payload: {json.dumps(payload, indent=2)}")
+    send_request(api_url, payload)
+
+
 def test_image_processing(api_url: str) -> None:
     """Test processing an image document."""
     print("\n=== Testing Image Document Processing ===\n")
     
-    # For testing, we'll use a simple image file
-    try:
-        with open("examples/sample_receipt.jpg", "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode("utf-8")
-    except FileNotFoundError:
-        print("Sample image file not found. Please create examples/sample_receipt.jpg")
+    payload = build_image_payload()
+    if payload is None:
         return
     
-    # Prepare the request payload
-    payload = {
-        "document_data": image_data,
-        "document_type": "image",
-        "instructions": "Extract the store name, date, total amount, and list of items purchased from this receipt."
-    }
-    
     # Send the request
     print("Sending request to API...")
     print(f"Payload: {json.dumps({**payload, 'document_data': '[BASE64 IMAGE DATA]'}, indent=2)}")
-    
-    try:
-        response = requests.post(f"{api_url}/process", json=payload)
-        
-        # Print the response
-        print(f"\nStatus Code: {response.status_code}")
-        if response.status_code == 200:
-            result = response.json()
-            print("Response:")
-            print(json.dumps(result, indent=2))
-        else:
-            print(f"Error: {response.text}")
-    except Exception as e:
-        print(f"Request failed: {e}")
+    send_request(api_url, payload)
 
 
 def test_pdf_processing(api_url: str) -> None:
     """Test processing a PDF document."""
     print("\n=== Testing PDF Document Processing ===\n")
     
-    # For testing, we'll use a simple PDF file
-    try:
-        with open("examples/sample_invoice.pdf", "rb") as pdf_file:
-            pdf_data = base64.b64encode(pdf_file.read()).decode("utf-8")
-    except FileNotFoundError:
-        print("Sample PDF file not found. Please create examples/sample_invoice.pdf")
+    payload = build_pdf_payload()
+    if payload is None:
         return
     
-    # Prepare the request payload
-    payload = {
-        "document_data": pdf_data,
-        "document_type": "pdf",
-        "instructions": "Extract the invoice number, date, customer details, and line items with their prices."
-    }
-    
     # Send the request
     print("Sending request to API...")
     print(f"Payload: {json.dumps({**payload, 'document_data': '[BASE64 PDF DATA]'}, indent=2)}")
+    send_request(api_url, payload)
+
+
+async def run_aiohttp(api_url: str, payload: Dict[str, Any], requests_count: int, concurrency: int) -> None:
+    """
+    Send the same payload concurrently over a shared aiohttp session.
     
-    try:
-        response = requests.post(f"{api_url}/process", json=payload)
-        
-        # Print the response
-        print(f"\nStatus Code: {response.status_code}")
-        if response.status_code == 200:
-            result = response.json()
-            print("Response:")
-            print(json.dumps(result, indent=2))
-        else:
-            print(f"Error: {response.text}")
-    except Exception as e:
-        print(f"Request failed: {e}")
+    Args:
+        api_url: API base URL
+        payload: Request payload to send
+        requests_count: Total number of requests to send
+        concurrency: Maximum number of requests in flight
+    """
+    import aiohttp
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    
+    async def send(session: "aiohttp.ClientSession") -> None:
+        async with semaphore:
+            try:
+                async with session.post(f"{api_url}/process", json=payload) as response:
+                    print_response(response.status, await response.text())
+            except Exception as e:
+                print(f"Request failed: {e}")
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*[send(session) for _ in range(requests_count)])
 
 
 def main():
     """Main function."""
     args = parse_args()
     
+    if not args.sync:
+        try:
+            import aiohttp
+        except ImportError:
+            print("Async mode requires aiohttp (pip install 'python-ai[examples]'); "
+                  "rerun with --sync to use requests instead.")
+            sys.exit(1)
+        
+        payload = PAYLOAD_BUILDERS[args.test_type]()
+        if payload is None:
+            sys.exit(1)
+        
+        print(f"\n=== Sending {args.requests} {args.test_type} request(s) "
+              f"with concurrency {args.concurrency} ===\n")
+        asyncio.run(run_aiohttp(args.api_url, payload, args.requests, args.concurrency))
+        return
+    
     # Run the appropriate test
     if args.test_type == "json":
         test_json_processing(args.api_url)
@@ -4,18 +4,23 @@ Handles loading environment variables and secrets management.
 """
 
 import os
+from functools import lru_cache
 from typing import Dict, Optional
-import boto3
-from dotenv import load_dotenv
-import json
 
-# Load environment variables from .env file if present
-load_dotenv()
+from src.utils.json_fast import loads
+
+# Load environment variables from .env file if present (local development only)
+if os.getenv("AWS_EXECUTION_ENV") is None:
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # Base configuration from environment variables
 DEFAULT_LLM_PROVIDER = os.getenv("DEFAULT_LLM_PROVIDER", "openai")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 AWS_SECRET_NAME = os.getenv("AWS_SECRET_NAME", "llm-utilities/api-keys")
+DEBUG = os.getenv("DEBUG", "False").lower() in ("1", "true", "yes")
+# Worker processes for PDF text extraction (1 extracts pages serially)
+PDF_TEXT_WORKERS = int(os.getenv("PDF_TEXT_WORKERS", "1"))
 
 # LLM Models configuration
 DEFAULT_MODELS = {
@@ -25,16 +30,42 @@ DEFAULT_MODELS = {
     "gemini": "gemini-pro",
 }
 
+@lru_cache(maxsize=1)
+def _get_secrets_client():
+    """
+    Get a Secrets Manager client shared across warm invocations.
+    
+    boto3 is imported lazily so cold starts only pay for it when secrets are needed.
+    The client is built from a dedicated session, so endpoint resolution and the
+    credential chain are only walked once per container.
+    
+    Returns:
+        boto3 Secrets Manager client
+    """
+    import boto3
+    session = boto3.session.Session(region_name=AWS_REGION)
+    return session.client('secretsmanager')
+
+# API keys cached for the lifetime of the container once resolved
+_CACHED_KEYS: Optional[Dict[str, str]] = None
+
 def get_api_keys() -> Dict[str, str]:
     """
     Retrieve API keys from environment variables or AWS Secrets Manager.
     
     In local development, keys are loaded from .env file.
-    In production (AWS Lambda), keys are retrieved from Secrets Manager.
+    In production (AWS Lambda), missing keys are filled from a single JSON
+    secret holding all provider keys. The result is cached once resolved, so
+    Secrets Manager is queried at most once per container; failed lookups are
+    not cached and are retried on the next call.
     
     Returns:
         Dict[str, str]: Dictionary of API keys by provider
     """
+    global _CACHED_KEYS
+    if _CACHED_KEYS is not None:
+        return _CACHED_KEYS
+    
     # First check environment variables (local development)
     api_keys = {
         "openai": os.getenv("OPENAI_API_KEY"),
@@ -47,9 +78,8 @@ def get_api_keys() -> Dict[str, str]:
     if None in api_keys.values() and os.getenv("AWS_EXECUTION_ENV") is not None:
         try:
             # Use AWS Secrets Manager in production
-            secrets_manager = boto3.client('secretsmanager', region_name=AWS_REGION)
-            response = secrets_manager.get_secret_value(SecretId=AWS_SECRET_NAME)
-            secrets = json.loads(response['SecretString'])
+            response = _get_secrets_client().get_secret_value(SecretId=AWS_SECRET_NAME)
+            secrets = loads(response['SecretString'])
             
             # Update missing keys from secrets
             for provider in api_keys:
@@ -57,7 +87,9 @@ def get_api_keys() -> Dict[str, str]:
                     api_keys[provider] = secrets[f"{provider.upper()}_API_KEY"]
         except Exception as e:
             print(f"Error retrieving secrets: {str(e)}")
+            return api_keys
     
+    _CACHED_KEYS = api_keys
     return api_keys
 
 def get_model_name(provider: Optional[str] = None) -> str:
@@ -2,15 +2,24 @@
 AWS Lambda handler for document processing API.
 """
 
-import json
-import traceback
-from typing import Dict, Any
+import gzip
+import logging
+from typing import Dict, Any, Union
+
+from pydantic import BaseModel
 
 from src.lambda_functions.document_processor.models import (
     DocumentProcessRequest,
     DocumentProcessResponse
 )
 from src.lambda_functions.document_processor.processor import DocumentProcessor
+from src.utils.b64_fast import b64decode, b64encode_as_string
+from src.utils.json_fast import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Response bodies smaller than this are sent uncompressed
+_COMPRESSION_MIN_BYTES = 4096
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -29,9 +38,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not body:
             return _build_response(400, {"error": "Missing request body"})
         
+        # Binary media types make API Gateway base64-encode the request body
+        if event.get('isBase64Encoded'):
+            body = b64decode(body)
+        
         # Parse JSON if body is a string
-        if isinstance(body, str):
-            body = json.loads(body)
+        if isinstance(body, (str, bytes)):
+            body = loads(body)
         
         # Validate request with Pydantic model
         try:
@@ -43,16 +56,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         processor = DocumentProcessor(request)
         response = processor.process()
         
-        # Return response
+        # Return response, compressed if the client accepts it
         return _build_response(
             200 if response.success else 500,
-            response.dict()
+            response,
+            accept_encoding=_get_header(event, "Accept-Encoding")
         )
         
     except Exception as e:
-        # Log the error
-        print(f"Error processing document: {str(e)}")
-        traceback.print_exc()
+        # Log the error; the traceback is formatted by the logging handler
+        logger.exception("Error processing document")
         
         # Return error response
         return _build_response(500, {
@@ -60,24 +73,60 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "message": str(e)
         })
 
-def _build_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+def _get_header(event: Dict[str, Any], name: str) -> str:
+    """
+    Get a request header from a Lambda event, ignoring case.
+    
+    Args:
+        event: Lambda event
+        name: Header name
+        
+    Returns:
+        Header value, or an empty string if it is not present
+    """
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value or ""
+    return ""
+
+def _build_response(status_code: int,
+                    body: Union[Dict[str, Any], BaseModel],
+                    accept_encoding: str = "") -> Dict[str, Any]:
     """
     Build Lambda response for API Gateway.
     
+    Pydantic models are serialized straight to JSON by pydantic-core,
+    skipping the intermediate dict that model_dump() would build.
+    Large bodies are gzip-compressed and base64-encoded when the client
+    accepts gzip.
+    
     Args:
         status_code: HTTP status code
-        body: Response body
+        body: Response body as a dict or Pydantic model
+        accept_encoding: Value of the request's Accept-Encoding header
         
     Returns:
         API Gateway response
     """
-    return {
+    payload = body.model_dump_json() if isinstance(body, BaseModel) else dumps(body)
+    response = {
         "statusCode": status_code,
         "headers": {
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "OPTIONS,POST"
+            "Access-Control-Allow-Methods": "OPTIONS,POST",
+            # Any response may be gzipped depending on Accept-Encoding
+            "Vary": "Accept-Encoding"
         },
-        "body": json.dumps(body)
-    } 
\ No newline at end of file
+        "body": payload
+    }
+    
+    if "gzip" in accept_encoding.lower() and len(payload) > _COMPRESSION_MIN_BYTES:
+        compressed = gzip.compress(payload.encode("utf-8"), compresslevel=1)
+        response["headers"]["Content-Encoding"] = "gzip"
+        response["isBase64Encoded"] = True
+        response["body"] = b64encode_as_string(compressed)
+    
+    return response
\ No newline at end of file
@@ -4,7 +4,7 @@ Pydantic models for document processing API.
 
 from typing import Dict, Any, List, Optional, Union
 from enum import Enum
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator
 
 
 class DocumentType(str, Enum):
@@ -82,9 +82,9 @@ class DocumentProcessResponse(BaseModel):
     error_message: Optional[str] = Field(None, description="Error message if processing failed")
     result: Optional[DocumentAnalysisResult] = Field(None, description="Document analysis result")
     
-    @validator('result', always=True)
-    def result_required_if_success(cls, v, values):
+    @model_validator(mode='after')
+    def result_required_if_success(self) -> 'DocumentProcessResponse':
         """Validate that result is provided if success is True."""
-        if values.get('success', False) and v is None:
+        if self.success and self.result is None:
             raise ValueError('result is required when success is True')
-        return v 
\ No newline at end of file
+        return self 
\ No newline at end of file
@@ -2,7 +2,11 @@
 Document processing logic for the Lambda function.
 """
 
-import uuid
+import hashlib
+import io
+import secrets
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Dict, Any, Optional
 
 from src.utils.llm_client import LLMClient
@@ -17,6 +21,54 @@ from src.lambda_functions.document_processor.models import (
     SummaryAnnotation
 )
 
+
+@lru_cache(maxsize=8)
+def _get_llm_client(provider: Optional[str] = None) -> LLMClient:
+    """
+    Get a shared LLM client for the given provider.
+    
+    Clients are cached at module level so warm Lambda invocations reuse
+    the same client instead of rebuilding it for every request.
+    
+    Args:
+        provider: The LLM provider to use, or None for the default
+        
+    Returns:
+        Cached LLM client instance
+    """
+    return LLMClient(provider=provider)
+
+
+# Analysis results kept across warm invocations, keyed by request content
+_RESULT_CACHE_SIZE = 128
+_RESULT_CACHE: "OrderedDict[bytes, DocumentAnalysisResult]" = OrderedDict()
+
+
+def _result_cache_key(request: DocumentProcessRequest) -> bytes:
+    """
+    Build the result cache key for a request.
+    
+    The full document is hashed together with everything else that affects
+    the LLM output (instructions, document type and provider).
+    
+    Args:
+        request: The document processing request
+        
+    Returns:
+        Digest identifying the request content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (
+        request.llm_provider or "",
+        request.document_type.value if request.document_type else "",
+        request.instructions,
+        request.document_data,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.digest()
+
+
 class DocumentProcessor:
     """
     Processes documents using LLM for analysis and structured output.
@@ -30,10 +82,10 @@ class DocumentProcessor:
             request: The document processing request
         """
         self.request = request
-        self.request_id = str(uuid.uuid4())
+        self.request_id = secrets.token_hex(16)
         
-        # Initialize LLM client with specified provider
-        self.llm_client = LLMClient(provider=request.llm_provider)
+        # Reuse the LLM client for the specified provider
+        self.llm_client = _get_llm_client(request.llm_provider)
     
     def process(self) -> DocumentProcessResponse:
         """
@@ -43,24 +95,42 @@ class DocumentProcessor:
             Document processing response with results
         """
         try:
-            # Parse document data
-            document_type = self.request.document_type.value if self.request.document_type else None
+            # Reuse a previous analysis of the same document and instructions
+            cache_key = _result_cache_key(self.request)
+            cached_result = _RESULT_CACHE.get(cache_key)
+            if cached_result is not None:
+                _RESULT_CACHE.move_to_end(cache_key)
+                return DocumentProcessResponse(
+                    request_id=self.request_id,
+                    success=True,
+                    result=cached_result
+                )
+            
+            # Parse document data; a known type lets the parser skip detection,
+            # and the prompt only describes images by their metadata
+            doc_type = self.request.document_type
             parsed_document = DocumentParser.parse(
                 self.request.document_data, 
-                file_type=document_type
+                file_type=doc_type.value if doc_type else None,
+                metadata_only=True
             )
             
-            # Determine document type from parsed result
-            if "image_type" in parsed_document:
-                doc_type = DocumentType.IMAGE
-            elif "page_count" in parsed_document:
-                doc_type = DocumentType.PDF
-            else:
-                doc_type = DocumentType.JSON
+            # Determine document type from parsed result if it was not given
+            if doc_type is None:
+                if "image_type" in parsed_document:
+                    doc_type = DocumentType.IMAGE
+                elif "page_count" in parsed_document:
+                    doc_type = DocumentType.PDF
+                else:
+                    doc_type = DocumentType.JSON
             
             # Generate analysis results using LLM
             analysis_result = self._generate_analysis(parsed_document, doc_type)
             
+            _RESULT_CACHE[cache_key] = analysis_result
+            if len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+            
             # Prepare successful response
             return DocumentProcessResponse(
                 request_id=self.request_id,
@@ -90,14 +160,14 @@ class DocumentProcessor:
         # Create analysis schema for LLM output
         analysis_result = self._get_llm_analysis(document_data, doc_type)
         
-        # Create document analysis result
+        # Create document analysis result; the LLM output is not copied into
+        # raw_llm_response since its annotations are already stored above
         return DocumentAnalysisResult(
             document_type=doc_type,
             metadata=self._extract_metadata(document_data, doc_type),
             text_annotations=analysis_result.text_annotations,
             entity_annotations=analysis_result.entity_annotations,
-            summary=analysis_result.summary,
-            raw_llm_response=analysis_result.dict()
+            summary=analysis_result.summary
         )
     
     def _extract_metadata(self, document_data: Dict[str, Any], doc_type: DocumentType) -> Dict[str, Any]:
@@ -177,31 +247,30 @@ class DocumentProcessor:
         Returns:
             Prompt for LLM
         """
-        prompt_parts = [
-            f"# Document Analysis Task\n\n",
-            f"## Instructions\n{self.request.instructions}\n\n",
-            f"## Document Type\n{doc_type.value}\n\n",
-            "## Document Content\n"
-        ]
+        buf = io.StringIO()
+        buf.write("# Document Analysis Task\n\n")
+        buf.write(f"## Instructions\n{self.request.instructions}\n\n")
+        buf.write(f"## Document Type\n{doc_type.value}\n\n")
+        buf.write("## Document Content\n")
         
         # Add document-specific content
         if doc_type == DocumentType.IMAGE:
-            prompt_parts.append(
+            buf.write(
                 f"Image of type {document_data.get('image_type')} "
                 f"with dimensions {document_data.get('width')}x{document_data.get('height')}.\n"
                 "Base64 data is available but not displayed for brevity.\n\n"
             )
         elif doc_type == DocumentType.PDF:
-            prompt_parts.append("PDF content:\n\n")
+            buf.write("PDF content:\n\n")
             for page in document_data.get("pages", []):
-                prompt_parts.append(f"Page {page.get('page_number')}:\n{page.get('text')}\n\n")
+                buf.write(f"Page {page.get('page_number')}:\n{page.get('text')}\n\n")
         else:  # JSON
-            prompt_parts.append(f"JSON content:\n{str(document_data)}\n\n")
+            buf.write(f"JSON content:\n{str(document_data)}\n\n")
         
         # Add analysis instructions
-        prompt_parts.append(
+        buf.write(
             "Based on the document and instructions provided, "
             "create a detailed analysis with text annotations, entity annotations, and a summary."
         )
         
-        return "".join(prompt_parts) 
\ No newline at end of file
+        return buf.getvalue() 
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""
+Fast base64 helpers.
+
+Uses pybase64 (SIMD-accelerated) when it is available and falls back to the standard library otherwise.
+"""
+
+try:
+    from pybase64 import b64decode, b64encode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode, b64encode
+
+    def b64encode_as_string(data: bytes) -> str:
+        """
+        Base64-encode bytes to a str.
+
+        Args:
+            data: Bytes to encode
+
+        Returns:
+            Base64 encoded string
+        """
+        return b64encode(data).decode("ascii")
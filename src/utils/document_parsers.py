@@ -2,116 +2,431 @@
 Document parsers for different input file types (images, PDFs, JSON).
 """
 
-import json
-import base64
-from typing import Dict, Any, Union, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from multiprocessing import get_context
+from typing import BinaryIO, Dict, Any, List, Tuple, Union, Optional
+import binascii
 import io
+import re
 
 from PIL import Image
 from pypdf import PdfReader
 
+from src.config.settings import PDF_TEXT_WORKERS
+from src.utils.b64_fast import b64decode, b64encode_as_string
+from src.utils.json_fast import loads
+
+# Magic-byte signatures checked against the start of decoded content
+_MAGIC = (
+    (b'%PDF', 'pdf'),
+    (b'\x89PNG', 'image'),
+    (b'\xff\xd8\xff', 'image'),
+    (b'GIF8', 'image'),
+    (b'RIFF', 'image'),
+    (b'{', 'json'),
+    (b'[', 'json'),
+)
+
+# Signatures of binary formats, for content that arrived base64 encoded;
+# parse_json reads JSON text directly, so encoded JSON must not match
+_BINARY_MAGIC = tuple(entry for entry in _MAGIC if entry[1] != 'json')
+
+# Data URL prefixes and the file type they carry
+_DATAURL = (
+    ('data:image', 'image'),
+    ('data:application/pdf', 'pdf'),
+)
+
+# Whitespace allowed before JSON or base64 content
+_LEADING_WHITESPACE = re.compile(r'\s*')
+
+# Longest data URL header accepted before the comma that starts the payload
+_DATAURL_MAX_HEADER = 64
+
+def _data_url_payload_start(data: str) -> int:
+    """
+    Find where the base64 payload of a data URL starts.
+    
+    Only the header is searched, so the payload is never scanned.
+    
+    Args:
+        data: Data URL string
+        
+    Returns:
+        Offset of the first payload character
+    """
+    comma = data.find(',', 0, _DATAURL_MAX_HEADER)
+    if comma < 0:
+        raise ValueError("Malformed data URL header")
+    return comma + 1
+
+def _match_magic(header: bytes, table: tuple = _MAGIC) -> Optional[str]:
+    """
+    Match a content header against the magic-byte table.
+    
+    Args:
+        header: First bytes of the decoded content
+        table: Signature table to match against
+        
+    Returns:
+        Detected file type, or None if no signature matches
+    """
+    for signature, file_type in table:
+        if header.startswith(signature):
+            return file_type
+    return None
+
+def _detect_type(data: Any) -> str:
+    """
+    Detect the file type of document data from its first few bytes.
+    
+    Only a short header is inspected, so detection cost does not depend
+    on the size of the document.
+    
+    Args:
+        data: Document data (bytes, string, or dict)
+        
+    Returns:
+        Detected file type ('image', 'pdf', 'json')
+    """
+    if isinstance(data, dict):
+        return 'json'
+    
+    if isinstance(data, bytes):
+        # Fail fast on unknown binary data rather than letting PIL reject it
+        file_type = _match_magic(data[:8])
+        if file_type is None:
+            raise ValueError("unrecognized binary payload")
+        return file_type
+    
+    if isinstance(data, str):
+        for prefix, file_type in _DATAURL:
+            if data.startswith(prefix):
+                return file_type
+        
+        # Skip leading whitespace without copying the rest of the string
+        start = _LEADING_WHITESPACE.match(data).end()
+        head = data[start:start + 16]
+        if head[:1] in ('{', '['):
+            return 'json'
+        
+        # Decode only the header of base64 content; the full payload is
+        # decoded once by the selected parser
+        try:
+            decoded_head = b64decode(head)
+        except ValueError:
+            raise ValueError("Could not determine file type")
+        return _match_magic(decoded_head, _BINARY_MAGIC) or 'image'
+    
+    raise ValueError("Could not determine file type")
+
+# Largest JSON document (in characters or bytes) kept in the parse cache,
+# bounding what the cache can hold alive in a warm container
+_JSON_CACHE_MAX_SIZE = 64 * 1024
+
+@lru_cache(maxsize=128)
+def _cached_loads(json_data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document, memoizing results for repeated payloads.
+    
+    The returned object is shared between callers and must not be mutated.
+    
+    Args:
+        json_data: JSON document as str or bytes
+        
+    Returns:
+        Parsed JSON value
+    """
+    return loads(json_data)
+
+# PDF document information keys copied into parse results
+_PDF_META_KEYS = ("/Author", "/Title", "/Subject", "/Creator", "/Producer", "/CreationDate", "/ModDate")
+
+# PDFs with at least this many pages extract text in worker processes
+# when PDF_TEXT_WORKERS is greater than 1
+_PARALLEL_MIN_PAGES = 16
+
+# PDF reader opened once per worker process
+_worker_pdf_reader = None
+
+def _init_pdf_worker(pdf_data: bytes) -> None:
+    """Open the PDF in a worker process."""
+    global _worker_pdf_reader
+    _worker_pdf_reader = PdfReader(io.BytesIO(pdf_data))
+
+def _extract_page_text(index: int) -> str:
+    """Extract the text of one page in a worker process."""
+    return _worker_pdf_reader.pages[index].extract_text()
+
+def _extract_texts_parallel(pdf_data: bytes, page_count: int) -> Optional[List[str]]:
+    """
+    Extract page text across worker processes.
+    
+    pypdf text extraction is CPU-bound pure Python, so threads do not help;
+    each worker process opens its own reader from the PDF bytes instead.
+    Workers are started with "spawn", so scripts calling this must guard
+    their entry point with ``if __name__ == "__main__"``.
+    
+    Args:
+        pdf_data: Raw PDF bytes
+        page_count: Number of pages in the PDF
+        
+    Returns:
+        Text per page, or None if parallel extraction is not possible
+    """
+    workers = min(page_count, PDF_TEXT_WORKERS)
+    if workers < 2:
+        return None
+    
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_pdf_worker,
+            initargs=(pdf_data,)
+        ) as executor:
+            chunksize = max(1, page_count // (workers * 4))
+            return list(executor.map(_extract_page_text, range(page_count), chunksize=chunksize))
+    except (OSError, NotImplementedError, BrokenProcessPool):
+        # Multiprocessing is unavailable (e.g. no /dev/shm on AWS Lambda)
+        return None
+
+def _read_image_header(image_file: BinaryIO) -> Tuple[int, int, str, str]:
+    """
+    Read image dimensions, format and mode without decoding pixel data.
+    
+    Args:
+        image_file: File-like object positioned at the start of the image
+        
+    Returns:
+        Tuple of (width, height, format name, mode)
+    """
+    with Image.open(image_file) as image:
+        width, height = image.size
+        return width, height, image.format or "UNKNOWN", image.mode
+
+class StreamingB64Decoder(io.RawIOBase):
+    """
+    Read-only, seekable file over base64 text that decodes on demand.
+    
+    The text is decoded in fixed-size blocks as the reader reaches them, so
+    parsers that only inspect a header never pay for decoding the whole payload.
+    The text must be pure base64 alphabet, which keeps byte offsets aligned with
+    4-character groups; any other character raises binascii.Error when read.
+    """
+    
+    # Characters of base64 text decoded at a time (a multiple of 4)
+    CHUNK_CHARS = 64 * 1024
+    _CHUNK_BYTES = CHUNK_CHARS // 4 * 3
+    
+    def __init__(self, encoded: str, start: int = 0):
+        """
+        Initialize the decoder.
+        
+        Args:
+            encoded: Base64 text
+            start: Offset of the first base64 character, e.g. past a data URL header
+        """
+        super().__init__()
+        self._encoded = encoded
+        self._start = start
+        length = len(encoded) - start
+        self._size = length // 4 * 3 - (encoded.endswith('==') + encoded.endswith('='))
+        self._pos = 0
+        self._chunk_index = -1
+        self._chunk = b''
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self._pos = offset
+        return offset
+    
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        written = 0
+        while written < len(view) and self._pos < self._size:
+            index, offset = divmod(self._pos, self._CHUNK_BYTES)
+            if index != self._chunk_index:
+                begin = self._start + index * self.CHUNK_CHARS
+                self._chunk = b64decode(self._encoded[begin:begin + self.CHUNK_CHARS], validate=True)
+                self._chunk_index = index
+            data = self._chunk[offset:offset + len(view) - written]
+            view[written:written + len(data)] = data
+            written += len(data)
+            self._pos += len(data)
+        return written
+
 class DocumentParser:
     """
     Parser for different document types (images, PDFs, JSON).
     """
     
     @staticmethod
-    def parse_image(image_data: Union[str, bytes]) -> Dict[str, Any]:
+    def parse_image(image_data: Union[str, bytes], metadata_only: bool = False) -> Dict[str, Any]:
         """
         Parse image data (either base64 encoded string or raw bytes).
         
         Args:
             image_data: Base64 encoded image or raw image bytes
+            metadata_only: Whether to omit the base64 data from the result.
+                           Base64 encoding raw bytes dominates the cost for
+                           large images, so callers needing only dimensions can skip it.
             
         Returns:
-            Dict with image metadata and base64 encoded data
+            Dict with image metadata and, unless metadata_only is set, base64 encoded data
         """
-        # Convert base64 string to bytes if needed
+        base64_data = None
         if isinstance(image_data, str):
+            start = 0
             if image_data.startswith('data:image'):
                 # Handle Data URLs
-                header, encoded = image_data.split(',', 1)
-                image_data = base64.b64decode(encoded)
+                start = _data_url_payload_start(image_data)
+            
+            if metadata_only and '\n' not in image_data and (len(image_data) - start) % 4 == 0:
+                # Only the header is needed, so decode it on demand
+                image_file = StreamingB64Decoder(image_data, start)
             else:
-                # Regular base64 string
-                image_data = base64.b64decode(image_data)
+                # Keep the original encoding for the result when it is clean
+                # base64, so it does not have to be re-encoded
+                encoded = image_data[start:] if start else image_data
+                try:
+                    image_data = b64decode(encoded, validate=True)
+                    base64_data = encoded
+                except binascii.Error:
+                    # Wrapped or whitespace-laden input is re-encoded canonically
+                    image_data = b64decode(encoded)
+                image_file = io.BytesIO(image_data)
+        else:
+            # Zero-copy view: BytesIO shares the bytes object until written to
+            image_file = io.BytesIO(image_data)
         
-        # Extract image metadata
-        image = Image.open(io.BytesIO(image_data))
-        width, height = image.size
-        format_name = image.format or "UNKNOWN"
+        # Extract image metadata; Image.open only parses the header and pixel
+        # data is never decoded, so only the header is read from the input
+        try:
+            width, height, format_name, mode = _read_image_header(image_file)
+        except binascii.Error:
+            # Whitespace or other non-alphabet characters break offset decoding;
+            # the non-validating decoder skips them as before
+            image_file = io.BytesIO(b64decode(image_data[start:]))
+            width, height, format_name, mode = _read_image_header(image_file)
         
         # Prepare output
         result = {
             "image_type": format_name,
             "width": width,
             "height": height,
-            "mode": image.mode,
-            "base64_data": base64.b64encode(image_data).decode('utf-8')
+            "mode": mode,
         }
         
+        if not metadata_only:
+            result["base64_data"] = base64_data if base64_data is not None else b64encode_as_string(image_data)
+        
         return result
     
     @staticmethod
-    def parse_pdf(pdf_data: Union[str, bytes]) -> Dict[str, Any]:
+    def parse_pdf(pdf_data: Union[str, bytes], extract_text: bool = True) -> Dict[str, Any]:
         """
         Parse PDF data (either base64 encoded string or raw bytes).
         
         Args:
             pdf_data: Base64 encoded PDF or raw PDF bytes
+            extract_text: Whether to extract page text. Text extraction is the
+                          most expensive step, so metadata-only callers can skip it.
             
         Returns:
-            Dict with PDF metadata and extracted text
+            Dict with PDF metadata and, if requested, extracted text per page
         """
         # Convert base64 string to bytes if needed
         if isinstance(pdf_data, str):
             if pdf_data.startswith('data:application/pdf'):
                 # Handle Data URLs
-                header, encoded = pdf_data.split(',', 1)
-                pdf_data = base64.b64decode(encoded)
+                pdf_data = b64decode(pdf_data[_data_url_payload_start(pdf_data):])
             else:
                 # Regular base64 string
-                pdf_data = base64.b64decode(pdf_data)
+                pdf_data = b64decode(pdf_data)
         
-        # Parse PDF
+        # Parse PDF; BytesIO shares the bytes object until written to, so
+        # wrapping it per call costs no copy (a pooled buffer would add one)
         pdf_file = io.BytesIO(pdf_data)
         pdf_reader = PdfReader(pdf_file)
         
-        # Extract text from pages
-        pages = []
-        for i, page in enumerate(pdf_reader.pages):
-            text = page.extract_text()
-            pages.append({
-                "page_number": i + 1,
-                "text": text
-            })
+        page_count = len(pdf_reader.pages)
+        
+        # Copy only the standard document information fields, with keys
+        # normalized from '/Author' to 'author'
+        meta = pdf_reader.metadata
         
         # Prepare output
         result = {
-            "page_count": len(pdf_reader.pages),
-            "metadata": dict(pdf_reader.metadata or {}),
-            "pages": pages,
+            "page_count": page_count,
+            "metadata": {k.lstrip('/').lower(): meta[k] for k in _PDF_META_KEYS if k in meta} if meta else {},
         }
         
+        # Extract text from pages into a pre-sized list, in parallel for large PDFs
+        if extract_text:
+            texts = None
+            if page_count >= _PARALLEL_MIN_PAGES:
+                texts = _extract_texts_parallel(pdf_data, page_count)
+            
+            pages = [None] * page_count
+            for i in range(page_count):
+                pages[i] = {
+                    "page_number": i + 1,
+                    "text": texts[i] if texts is not None else pdf_reader.pages[i].extract_text()
+                }
+            result["pages"] = pages
+        
         return result
     
     @staticmethod
-    def parse_json(json_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def parse_json(json_data: Union[str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Parse JSON data (either string or already parsed dict).
         
+        Documents up to 64 KiB are memoized, so the returned object may be
+        shared with other callers and must not be mutated.
+        
         Args:
-            json_data: JSON string or parsed JSON object
+            json_data: JSON string/bytes or parsed JSON object
             
         Returns:
             Parsed JSON data as dict
         """
-        if isinstance(json_data, str):
-            return json.loads(json_data)
+        # Already-parsed dicts are the common case for direct callers, so
+        # check the exact type first and skip the isinstance call
+        if type(json_data) is dict:
+            return json_data
+        if isinstance(json_data, (str, bytes)):
+            if len(json_data) > _JSON_CACHE_MAX_SIZE:
+                return loads(json_data)
+            return _cached_loads(json_data)
         return json_data
     
+    # Parser for each file type; image parsers also take metadata_only
+    _DISPATCH = {
+        'image': parse_image.__func__,
+        'pdf': parse_pdf.__func__,
+        'json': parse_json.__func__,
+    }
+    
     @classmethod
-    def parse(cls, data: Any, file_type: Optional[str] = None) -> Dict[str, Any]:
+    def parse(cls, data: Any, file_type: Optional[str] = None, metadata_only: bool = False) -> Dict[str, Any]:
         """
         Parse document data based on type.
         
@@ -119,46 +434,19 @@ class DocumentParser:
             data: Document data (bytes, string, or dict)
             file_type: Optional hint for the file type ('image', 'pdf', 'json')
                        If None, will try to detect automatically
+            metadata_only: Whether to omit base64 image data from image results
                        
         Returns:
             Dict with parsed document data
         """
         # Try to determine file type if not provided
         if file_type is None:
-            if isinstance(data, dict):
-                file_type = 'json'
-            elif isinstance(data, (str, bytes)):
-                # Try to detect from content
-                if isinstance(data, str):
-                    if data.startswith('data:image'):
-                        file_type = 'image'
-                    elif data.startswith('data:application/pdf'):
-                        file_type = 'pdf'
-                    elif data.startswith('{') and data.endswith('}'):
-                        file_type = 'json'
-                    else:
-                        try:
-                            base64.b64decode(data)
-                            # We'll need to try to detect if this is a PDF or image
-                            # Simplified detection - can be improved
-                            if b'%PDF' in base64.b64decode(data)[:10]:
-                                file_type = 'pdf'
-                            else:
-                                file_type = 'image'
-                        except:
-                            raise ValueError("Could not determine file type")
-                else:  # bytes
-                    if data[:4] == b'%PDF':
-                        file_type = 'pdf'
-                    else:
-                        file_type = 'image'  # Assume image for other binary data
+            file_type = _detect_type(data)
         
         # Parse based on determined file type
+        parser = cls._DISPATCH.get(file_type)
+        if parser is None:
+            raise ValueError(f"Unsupported file type: {file_type}")
         if file_type == 'image':
-            return cls.parse_image(data)
-        elif file_type == 'pdf':
-            return cls.parse_pdf(data)
-        elif file_type == 'json':
-            return cls.parse_json(data)
-        else:
-            raise ValueError(f"Unsupported file type: {file_type}") 
\ No newline at end of file
+            return parser(data, metadata_only=metadata_only)
+        return parser(data) 
\ No newline at end of file
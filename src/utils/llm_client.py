@@ -2,9 +2,11 @@
 LLM Client utility using instructor with litellm for provider flexibility.
 """
 
-from typing import Dict, Any, Optional, Type, TypeVar
+import asyncio
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Type, TypeVar
 import instructor
-from litellm import completion
+from litellm import acompletion, completion
 from pydantic import BaseModel
 
 from src.config.settings import get_api_keys, get_model_name
@@ -12,6 +14,46 @@ from src.config.settings import get_api_keys, get_model_name
 # Type variable for generic response schema
 T = TypeVar('T', bound=BaseModel)
 
+@lru_cache(maxsize=1)
+def _get_instructor_client() -> instructor.Instructor:
+    """
+    Get the instructor client wrapping litellm's completion function.
+    
+    The wrapper does not depend on the provider, so one instance is shared
+    by every LLMClient in the process.
+    
+    Returns:
+        Instructor client
+    """
+    return instructor.from_litellm(completion)
+
+@lru_cache(maxsize=1)
+def _get_async_instructor_client() -> instructor.AsyncInstructor:
+    """
+    Get the async instructor client wrapping litellm's acompletion function.
+    
+    Returns:
+        Async instructor client
+    """
+    return instructor.from_litellm(acompletion)
+
+def _build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Build the chat messages for a prompt.
+    
+    Args:
+        prompt: The user prompt/question to send to the LLM
+        system_prompt: Optional system prompt to guide the LLM
+        
+    Returns:
+        List of chat messages
+    """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
 class LLMClient:
     """
     A client for making LLM requests using instructor with litellm.
@@ -29,20 +71,34 @@ class LLMClient:
         self.provider = provider
         self._api_keys = get_api_keys()
         self.model = get_model_name(provider)
+        
+        # Parameters shared by every request from this client
+        self._base_params = {
+            "model": self.model,
+            "api_key": self._api_keys.get(provider or "openai"),
+        }
     
-    def _get_client_params(self) -> Dict[str, Any]:
+    def _request_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Get the parameters for the LLM client based on the provider.
+        Get the parameters for a request.
         
+        If the API key could not be resolved when the client was created
+        (e.g. a failed Secrets Manager lookup), it is looked up again so a
+        cached client recovers once the key becomes available.
+        
+        Args:
+            kwargs: Per-request parameter overrides
+            
         Returns:
-            Dict[str, Any]: Parameters for the LLM client
+            Request parameters; the shared dict is only copied when overridden
         """
-        provider = self.provider or "openai"
+        if self._base_params["api_key"] is None:
+            self._api_keys = get_api_keys()
+            api_key = self._api_keys.get(self.provider or "openai")
+            if api_key is not None:
+                self._base_params = {**self._base_params, "api_key": api_key}
         
-        return {
-            "model": self.model,
-            "api_key": self._api_keys.get(provider),
-        }
+        return {**self._base_params, **kwargs} if kwargs else self._base_params
     
     def generate_structured_output(self, 
                                   schema: Type[T], 
@@ -61,24 +117,73 @@ class LLMClient:
         Returns:
             An instance of the provided schema with the LLM's response
         """
-        # Create instructor client with litellm
-        client = instructor.from_litellm(completion)
+        # Reuse the shared instructor client
+        client = _get_instructor_client()
         
         # Prepare parameters
-        params = self._get_client_params()
-        params.update(kwargs)
-        
-        # Prepare messages
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        params = self._request_params(kwargs)
         
         # Generate response with structured output
         response = client.chat.completions.create(
-            messages=messages,
+            messages=_build_messages(prompt, system_prompt),
             response_model=schema,
             **params
         )
         
-        return response 
\ No newline at end of file
+        return response
+    
+    async def agenerate_structured_output_batch(self,
+                                                schema: Type[T],
+                                                prompts: List[str],
+                                                system_prompt: Optional[str] = None,
+                                                **kwargs) -> List[T]:
+        """
+        Generate structured outputs for several prompts concurrently.
+        
+        Requests are sent in parallel through litellm's async client, so the
+        batch takes roughly as long as its slowest request.
+        
+        Args:
+            schema: Pydantic model class defining the expected response structure
+            prompts: The user prompts to send to the LLM
+            system_prompt: Optional system prompt shared by every prompt
+            **kwargs: Additional parameters to pass to the LLM client
+            
+        Returns:
+            Instances of the provided schema, in the same order as the prompts
+        """
+        client = _get_async_instructor_client()
+        params = self._request_params(kwargs)
+        
+        return await asyncio.gather(*[
+            client.chat.completions.create(
+                messages=_build_messages(prompt, system_prompt),
+                response_model=schema,
+                **params
+            )
+            for prompt in prompts
+        ])
+    
+    def generate_structured_output_batch(self,
+                                         schema: Type[T],
+                                         prompts: List[str],
+                                         system_prompt: Optional[str] = None,
+                                         **kwargs) -> List[T]:
+        """
+        Generate structured outputs for several prompts concurrently.
+        
+        Synchronous wrapper around agenerate_structured_output_batch for
+        callers without a running event loop, such as the Lambda handler.
+        
+        Args:
+            schema: Pydantic model class defining the expected response structure
+            prompts: The user prompts to send to the LLM
+            system_prompt: Optional system prompt shared by every prompt
+            **kwargs: Additional parameters to pass to the LLM client
+            
+        Returns:
+            Instances of the provided schema, in the same order as the prompts
+        """
+        return asyncio.run(
+            self.agenerate_structured_output_batch(schema, prompts, system_prompt, **kwargs)
+        ) 
\ No newline at end of file
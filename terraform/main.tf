@@ -11,6 +11,11 @@ resource "aws_lambda_function" "document_processor" {
   package_type = "Image"
   image_uri    = var.container_image_uri
 
+  # Only invoked by the REST API, so use the API Gateway v1 handler directly
+  image_config {
+    command = ["src.lambda_functions.document_processor.handler.lambda_handler"]
+  }
+
   # Lambda configuration
   timeout     = 30
   memory_size = 1024
@@ -111,6 +116,9 @@ data "aws_secretsmanager_secret" "llm_api_keys" {
 resource "aws_api_gateway_rest_api" "llm_utilities_api" {
   name        = "llm-utilities-api"
   description = "API for LLM utilities"
+
+  # Lets the Lambda return gzip-compressed, base64-encoded response bodies
+  binary_media_types = ["*/*"]
 }
 
 # API Gateway resource
@@ -2,10 +2,11 @@
 Tests for document processor Lambda function.
 """
 
-import json
+import io
+import gzip
 import base64
 import pytest
-from unittest.mock import patch, MagicMock, ANY
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
 
 from src.lambda_functions.document_processor.models import (
     DocumentProcessRequest,
@@ -16,9 +17,17 @@ from src.lambda_functions.document_processor.models import (
     EntityAnnotation,
     SummaryAnnotation
 )
-from src.lambda_functions.document_processor.processor import DocumentProcessor
-from src.lambda_functions.document_processor.handler import lambda_handler
+from src.lambda_functions.document_processor.processor import (
+    DocumentProcessor,
+    _get_llm_client,
+    _RESULT_CACHE
+)
+from src.lambda_functions.document_processor.handler import lambda_handler, _build_response
+from src.utils import document_parsers
+from src.utils.document_parsers import DocumentParser, StreamingB64Decoder, _detect_type
 from src.utils.llm_client import LLMClient
+from src.utils.json_fast import dumps, loads
+from src.config import settings
 
 # Sample test data
 SAMPLE_JSON = {
@@ -32,7 +41,7 @@ SAMPLE_JSON = {
     }
 }
 
-SAMPLE_JSON_B64 = base64.b64encode(json.dumps(SAMPLE_JSON).encode()).decode()
+SAMPLE_JSON_B64 = base64.b64encode(dumps(SAMPLE_JSON).encode()).decode()
 
 # Mock LLM response for testing
 MOCK_LLM_RESPONSE = {
@@ -61,14 +70,18 @@ def mock_llm_client():
         mock_instance = MagicMock()
         mock_instance.generate_structured_output.return_value = DocumentAnalysisResult(**MOCK_LLM_RESPONSE)
         mock_client.return_value = mock_instance
+        _get_llm_client.cache_clear()
+        _RESULT_CACHE.clear()
         yield mock_client
+        _get_llm_client.cache_clear()
+        _RESULT_CACHE.clear()
 
 
 def test_document_processor_with_json(mock_llm_client):
     """Test document processor with JSON input."""
     # Create request
     request = DocumentProcessRequest(
-        document_data=json.dumps(SAMPLE_JSON),
+        document_data=dumps(SAMPLE_JSON),
         document_type=DocumentType.JSON,
         instructions="Extract contact information."
     )
@@ -83,13 +96,14 @@ def test_document_processor_with_json(mock_llm_client):
     assert len(response.result.text_annotations) == 2
     assert len(response.result.entity_annotations) == 3
     assert response.result.summary.summary == "Contact information for John Doe, a 35-year-old living in Anytown."
+    assert response.result.raw_llm_response is None
 
 
 def test_json_auto_detection(mock_llm_client):
     """Test document processor with auto detection of JSON."""
     # Create request without specifying document type
     request = DocumentProcessRequest(
-        document_data=json.dumps(SAMPLE_JSON),
+        document_data=dumps(SAMPLE_JSON),
         instructions="Extract contact information."
     )
     
@@ -124,7 +138,7 @@ def test_processor_builds_proper_prompt():
     """Test that the processor builds a proper prompt for the LLM."""
     with patch('src.lambda_functions.document_processor.processor.LLMClient'):
         request = DocumentProcessRequest(
-            document_data=json.dumps(SAMPLE_JSON),
+            document_data=dumps(SAMPLE_JSON),
             document_type=DocumentType.JSON,
             instructions="Extract contact information."
         )
@@ -147,7 +161,7 @@ def test_processor_extracts_correct_metadata():
     """Test that the processor extracts correct metadata."""
     with patch('src.lambda_functions.document_processor.processor.LLMClient'):
         request = DocumentProcessRequest(
-            document_data=json.dumps(SAMPLE_JSON),
+            document_data=dumps(SAMPLE_JSON),
             document_type=DocumentType.JSON,
             instructions="Extract contact information."
         )
@@ -172,6 +186,161 @@ def test_processor_extracts_correct_metadata():
         assert image_metadata["height"] == 600
 
 
+def test_pdf_metadata_keys_normalized():
+    """Test that PDF metadata is limited to standard fields with normalized keys."""
+    from pypdf import PdfWriter
+    
+    writer = PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.add_metadata({"/Author": "Someone", "/Title": "Report", "/Custom": "ignored"})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    
+    result = DocumentParser.parse_pdf(buffer.getvalue(), extract_text=False)
+    
+    assert result["page_count"] == 1
+    assert result["metadata"]["author"] == "Someone"
+    assert result["metadata"]["title"] == "Report"
+    assert "custom" not in result["metadata"]
+    assert "/Custom" not in result["metadata"]
+
+def _make_text_pdf(page_count):
+    """Build a PDF whose pages each contain the text 'Page N'."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    writer = PdfWriter()
+    for number in range(1, page_count + 1):
+        page = writer.add_blank_page(width=200, height=200)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        content = DecodedStreamObject()
+        content.set_data(b"BT /F1 12 Tf 20 100 Td (Page %d) Tj ET" % number)
+        page.replace_contents(content)
+    
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def test_parallel_pdf_text_matches_serial(monkeypatch):
+    """Test that text extracted in worker processes matches serial extraction."""
+    pdf_data = _make_text_pdf(document_parsers._PARALLEL_MIN_PAGES + 4)
+    serial = DocumentParser.parse_pdf(pdf_data)
+    
+    monkeypatch.setattr(document_parsers, "PDF_TEXT_WORKERS", 2)
+    texts = document_parsers._extract_texts_parallel(pdf_data, serial["page_count"])
+    parallel = DocumentParser.parse_pdf(pdf_data)
+    
+    assert texts == [page["text"] for page in serial["pages"]]
+    assert parallel == serial
+    assert serial["pages"][-1]["text"] == f"Page {serial['page_count']}"
+
+def test_parallel_pdf_text_falls_back_to_serial(monkeypatch):
+    """Test that PDF text is extracted serially when worker processes are unavailable."""
+    pdf_data = _make_text_pdf(document_parsers._PARALLEL_MIN_PAGES)
+    serial = DocumentParser.parse_pdf(pdf_data)
+    
+    pool = MagicMock(side_effect=OSError("No /dev/shm"))
+    monkeypatch.setattr(document_parsers, "PDF_TEXT_WORKERS", 2)
+    monkeypatch.setattr(document_parsers, "ProcessPoolExecutor", pool)
+    
+    assert DocumentParser.parse_pdf(pdf_data) == serial
+    pool.assert_called_once()
+
+def test_parse_image_metadata_only_skips_base64():
+    """Test that metadata-only image parsing omits the base64 data."""
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 3)).save(buffer, format="PNG")
+    
+    full = DocumentParser.parse_image(buffer.getvalue())
+    light = DocumentParser.parse_image(buffer.getvalue(), metadata_only=True)
+    
+    assert "base64_data" in full
+    assert "base64_data" not in light
+    assert (light["image_type"], light["width"], light["height"]) == ("PNG", 4, 3)
+
+def test_streaming_b64_decoder_reads_at_offsets():
+    """Test that the streaming decoder matches a full decode across chunk boundaries."""
+    raw = bytes(range(256)) * 500
+    encoded = "data:image/png;base64," + base64.b64encode(raw).decode()
+    decoder = StreamingB64Decoder(encoded, start=encoded.index(",") + 1)
+    
+    boundary = StreamingB64Decoder.CHUNK_CHARS // 4 * 3
+    decoder.seek(boundary - 10)
+    assert decoder.read(20) == raw[boundary - 10:boundary + 10]
+    decoder.seek(-5, io.SEEK_END)
+    assert decoder.read() == raw[-5:]
+    decoder.seek(0)
+    assert decoder.read() == raw
+
+def test_unrecognized_binary_payload_rejected():
+    """Test that binary data without a known signature is rejected before parsing."""
+    assert DocumentParser.parse(b'{"name": "John"}') == {"name": "John"}
+    
+    with pytest.raises(ValueError, match="unrecognized binary payload"):
+        DocumentParser.parse(b"\x00\x01garbage")
+
+def test_parse_image_accepts_whitespace_in_base64():
+    """Test that base64 broken up by spaces still parses as before."""
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 3)).save(buffer, format="JPEG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    # Four-character separators keep the length a multiple of 4, so the
+    # streaming decoder is tried first and must fall back
+    spaced = "   \t".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    
+    result = DocumentParser.parse_image(spaced, metadata_only=True)
+    
+    assert (result["image_type"], result["width"], result["height"]) == ("JPEG", 4, 3)
+
+def test_base64_json_not_detected_as_json():
+    """Test that base64-encoded JSON is not dispatched to the JSON parser."""
+    assert _detect_type(SAMPLE_JSON_B64) != "json"
+    assert _detect_type(dumps(SAMPLE_JSON)) == "json"
+
+def test_detection_skips_leading_whitespace():
+    """Test that leading whitespace does not break base64 type detection."""
+    from pypdf import PdfWriter
+    
+    writer = PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    
+    assert _detect_type("\n" + encoded) == "pdf"
+    assert _detect_type("  \n" + dumps(SAMPLE_JSON)) == "json"
+
+def test_large_json_not_memoized():
+    """Test that only small JSON documents are served from the parse cache."""
+    small = dumps(SAMPLE_JSON)
+    large = dumps({"items": ["x" * 100] * 1000})
+    
+    assert DocumentParser.parse_json(small) is DocumentParser.parse_json(small)
+    assert DocumentParser.parse_json(large) is not DocumentParser.parse_json(large)
+
+def test_parse_image_returns_canonical_base64():
+    """Test that wrapped base64 input is returned without its line breaks."""
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 3)).save(buffer, format="PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    wrapped = "\r\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    
+    assert DocumentParser.parse_image(wrapped)["base64_data"] == encoded
+    assert DocumentParser.parse_image(encoded)["base64_data"] is encoded
+
 def test_processor_error_handling():
     """Test error handling in the processor."""
     # Test with invalid JSON
@@ -193,7 +362,7 @@ def test_processor_with_different_llm_provider(mock_llm_client):
     """Test processor with different LLM provider."""
     # Create request with specific LLM provider
     request = DocumentProcessRequest(
-        document_data=json.dumps(SAMPLE_JSON),
+        document_data=dumps(SAMPLE_JSON),
         document_type=DocumentType.JSON,
         instructions="Extract contact information.",
         llm_provider="anthropic"
@@ -207,6 +376,40 @@ def test_processor_with_different_llm_provider(mock_llm_client):
     mock_llm_client.assert_called_once_with(provider="anthropic")
 
 
+def test_llm_client_reused_across_requests(mock_llm_client):
+    """Test that processors share a cached LLM client per provider."""
+    request = DocumentProcessRequest(
+        document_data=dumps(SAMPLE_JSON),
+        document_type=DocumentType.JSON,
+        instructions="Extract contact information."
+    )
+    
+    first = DocumentProcessor(request)
+    second = DocumentProcessor(request)
+    
+    # Client should only be constructed once for the same provider
+    assert first.llm_client is second.llm_client
+    mock_llm_client.assert_called_once_with(provider=None)
+
+
+def test_repeated_request_served_from_cache(mock_llm_client):
+    """Test that an identical request reuses the cached analysis."""
+    request = DocumentProcessRequest(
+        document_data=dumps(SAMPLE_JSON),
+        document_type=DocumentType.JSON,
+        instructions="Extract contact information."
+    )
+    
+    first = DocumentProcessor(request).process()
+    second = DocumentProcessor(request).process()
+    
+    # LLM should only be called for the first request
+    assert first.success is True and second.success is True
+    assert second.result is first.result
+    assert second.request_id != first.request_id
+    mock_llm_client.return_value.generate_structured_output.assert_called_once()
+
+
 def test_lambda_handler():
     """Test Lambda handler function."""
     with patch('src.lambda_functions.document_processor.processor.DocumentProcessor') as mock_processor:
@@ -221,8 +424,8 @@ def test_lambda_handler():
         
         # Create Lambda event
         event = {
-            "body": json.dumps({
-                "document_data": json.dumps(SAMPLE_JSON),
+            "body": dumps({
+                "document_data": dumps(SAMPLE_JSON),
                 "document_type": "json",
                 "instructions": "Extract contact information."
             })
@@ -233,16 +436,37 @@ def test_lambda_handler():
         
         # Verify response
         assert response["statusCode"] == 200
-        body = json.loads(response["body"])
+        body = loads(response["body"])
         assert body["success"] is True
 
 
+def test_large_response_gzip_compressed():
+    """Test that large responses are compressed when the client accepts gzip."""
+    body = {"annotations": ["annotation text"] * 1000}
+    
+    response = _build_response(200, body, accept_encoding="gzip, deflate")
+    
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    decoded = gzip.decompress(base64.b64decode(response["body"]))
+    assert loads(decoded) == body
+    
+    # Without gzip support the body is returned as plain JSON
+    plain = _build_response(200, body)
+    assert "isBase64Encoded" not in plain
+    assert loads(plain["body"]) == body
+    
+    # Both representations depend on Accept-Encoding for shared caches
+    assert response["headers"]["Vary"] == "Accept-Encoding"
+    assert plain["headers"]["Vary"] == "Accept-Encoding"
+
+
 def test_invalid_request():
     """Test Lambda handler with invalid request."""
     # Create invalid Lambda event (missing required field)
     event = {
-        "body": json.dumps({
-            "document_data": json.dumps(SAMPLE_JSON),
+        "body": dumps({
+            "document_data": dumps(SAMPLE_JSON),
             # Missing instructions
         })
     }
@@ -252,5 +476,85 @@ def test_invalid_request():
     
     # Verify response
     assert response["statusCode"] == 400
-    body = json.loads(response["body"])
-    assert "error" in body 
\ No newline at end of file
+    body = loads(response["body"])
+    assert "error" in body 
+
+
+def test_direct_handler_rejects_invalid_request():
+    """Test that direct invocations report invalid requests as a 400."""
+    from src.lambda_functions.document_processor.app import direct_handler
+    
+    response = direct_handler({
+        "document_data": dumps(SAMPLE_JSON),
+        "instructions": "Extract key information",
+        "document_type": "spreadsheet"
+    }, None)
+    
+    assert response["statusCode"] == 400
+    assert "Invalid request" in loads(response["body"])["error"]
+
+
+def test_api_keys_fetched_from_secrets_manager_once(monkeypatch):
+    """Test that Secrets Manager is queried once and the keys are cached."""
+    monkeypatch.setenv("AWS_EXECUTION_ENV", "AWS_Lambda_python3.10")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(settings, "_CACHED_KEYS", None)
+    
+    mock_secrets = MagicMock()
+    mock_secrets.get_secret_value.return_value = {
+        "SecretString": dumps({"OPENAI_API_KEY": "sk-test"})
+    }
+    
+    with patch.object(settings, "_get_secrets_client", return_value=mock_secrets):
+        first = settings.get_api_keys()
+        second = settings.get_api_keys()
+    
+    assert first["openai"] == "sk-test"
+    assert second is first
+    mock_secrets.get_secret_value.assert_called_once()
+
+
+def test_cached_llm_client_recovers_after_failed_key_lookup(monkeypatch):
+    """Test that a cached client picks up the API key once a failed lookup succeeds."""
+    monkeypatch.setenv("AWS_EXECUTION_ENV", "AWS_Lambda_python3.10")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(settings, "_CACHED_KEYS", None)
+    
+    mock_secrets = MagicMock()
+    mock_secrets.get_secret_value.side_effect = [
+        Exception("ThrottlingException"),
+        {"SecretString": dumps({"OPENAI_API_KEY": "sk-x"})},
+    ]
+    mock_instructor = MagicMock()
+    _get_llm_client.cache_clear()
+    
+    with patch.object(settings, "_get_secrets_client", return_value=mock_secrets), \
+         patch('src.utils.llm_client._get_instructor_client', return_value=mock_instructor):
+        client = _get_llm_client(None)
+        assert client._base_params["api_key"] is None
+        
+        client.generate_structured_output(schema=SummaryAnnotation, prompt="Summarize.")
+    
+    assert _get_llm_client(None) is client
+    assert mock_instructor.chat.completions.create.call_args.kwargs["api_key"] == "sk-x"
+    _get_llm_client.cache_clear()
+
+
+def test_llm_client_batch_preserves_prompt_order():
+    """Test that batched LLM requests return results in prompt order."""
+    async def fake_create(messages, response_model, **params):
+        return SummaryAnnotation(summary=messages[-1]["content"])
+    
+    mock_async_client = MagicMock()
+    mock_async_client.chat.completions.create = AsyncMock(side_effect=fake_create)
+    
+    with patch('src.utils.llm_client._get_async_instructor_client', return_value=mock_async_client):
+        client = LLMClient(provider="openai")
+        results = client.generate_structured_output_batch(
+            schema=SummaryAnnotation,
+            prompts=["first", "second", "third"],
+            system_prompt="Summarize."
+        )
+    
+    assert [r.summary for r in results] == ["first", "second", "third"]
+    assert mock_async_client.chat.completions.create.await_count == 3